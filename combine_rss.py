@@ -1,6 +1,11 @@
-import feedparser
-import xml.etree.ElementTree as ET
-from datetime import datetime
+import json
+import os
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
 
 # RSS feed URLs
 rss_feeds = [
@@ -9,20 +14,121 @@ rss_feeds = [
 ]
 
 ARCHIVE_PREFIX = "https://archive.is/o/94ovq/"
+REQUEST_TIMEOUT = 15
+RETRY_COUNT = 3
+OUTPUT_FILE = "combined.xml"
+FEED_CACHE_FILE = "feed_cache.json"  # etag/last-modified + entries per feed
 
-def fetch_items(feed_urls):
+# fixed-shape output, so it is filled from templates instead of a DOM
+RSS_HEAD = (
+    "<?xml version='1.0' encoding='utf-8'?>\n"
+    '<rss version="2.0"><channel>'
+    "<title>Combined Le Monde RSS Feed</title>"
+    "<link>https://yourusername.github.io/combined.xml</link>"
+    "<description>Combined feed of multiple sources with archive.is/o/94ovq links</description>"
+)
+RSS_TAIL = "</channel></rss>"
+ITEM_TMPL = (
+    "<item><title>{title}</title><link>{link}</link>"
+    "<description>{description}</description><pubDate>{pubDate}</pubDate></item>"
+)
+
+# one keep-alive session so feeds on the same host share a connection;
+# only timeouts, throttling and 5xx are retried, after 0, 2 and 4 s plus up
+# to 1 s of jitter; Retry-After is ignored so a throttling server can't stall
+# the hourly run for hours (urllib3 only caps it in recent releases)
+RETRY = Retry(
+    total=RETRY_COUNT,
+    backoff_factor=1,
+    backoff_jitter=1.0,
+    respect_retry_after_header=False,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    raise_on_status=False
+)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=len(rss_feeds), max_retries=RETRY))
+
+def load_feed_cache():
+    try:
+        with open(FEED_CACHE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_feed_cache(cache):
+    # write aside and swap in, so a crashed run never leaves half a cache
+    tmp_file = FEED_CACHE_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_file, FEED_CACHE_FILE)
+
+def fetch_feed(feed_url, cache):
+    cached = cache.get(feed_url, {})
+    headers = {}
+    if cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached.get("modified"):
+        headers["If-Modified-Since"] = cached["modified"]
+
+    try:
+        r = SESSION.get(feed_url, headers=headers, timeout=REQUEST_TIMEOUT)
+        r.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Failed to fetch {feed_url}: {e}")
+        # keep serving the last good parse rather than dropping the feed
+        return cached.get("entries", [])
+
+    # unchanged since the last run, reuse the entries parsed back then
+    if r.status_code == 304:
+        return cached.get("entries", [])
+
+    # imported here so runs where every feed answers 304 skip loading it
+    import feedparser
+
+    # hand over the response context so feedparser still resolves relative
+    # links against the feed URL and honours a Content-Type charset
+    feed = feedparser.parse(
+        r.content,
+        response_headers={
+            **{k.lower(): v for k, v in r.headers.items()},
+            "content-location": r.url
+        }
+    )
+    entries = [
+        {
+            "title": entry.get("title", "No title"),
+            "link": entry.get("link", ""),
+            "description": entry.get("description", ""),
+            "published": entry.get("published")
+        }
+        for entry in feed.entries
+    ]
+
+    cache[feed_url] = {
+        "etag": r.headers.get("ETag"),
+        "modified": r.headers.get("Last-Modified"),
+        "entries": entries
+    }
+    return entries
+
+def fetch_items(feed_urls, cache):
     all_items = []
     seen_links = set()  # to track duplicates by link
+    # fallback pubDate, formatted once per run rather than per entry
+    now_str = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
 
-    for feed_url in feed_urls:
-        feed = feedparser.parse(feed_url)
+    # download/parse all feeds at once; map() keeps feed order so dedup stays stable
+    with ThreadPoolExecutor(max_workers=max(1, len(feed_urls))) as ex:
+        feeds = list(ex.map(lambda url: fetch_feed(url, cache), feed_urls))
 
-        for entry in feed.entries:
+    for entries in feeds:
+        for entry in entries:
             # skip if no link at all
-            if not hasattr(entry, "link") or not entry.link.strip():
+            if not entry["link"].strip():
                 continue
 
-            original_link = entry.link.strip()
+            original_link = entry["link"].strip()
 
             # only skip if we already added one with this link
             if original_link in seen_links:
@@ -30,38 +136,36 @@ def fetch_items(feed_urls):
 
             seen_links.add(original_link)
 
-            archive_link = ARCHIVE_PREFIX + original_link
-
             all_items.append({
-                "title": entry.get("title", "No title"),
-                "link": archive_link,
-                "description": entry.get("description", ""),
-                "pubDate": entry.get("published", datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0000"))
+                "title": entry["title"],
+                "original_link": original_link,
+                "description": entry["description"],
+                "pubDate": entry["published"] or now_str
             })
 
     # Ensure at least one inclusion per unique article
     return all_items
 
-def create_rss(items):
-    rss = ET.Element("rss", version="2.0")
-    channel = ET.SubElement(rss, "channel")
-    ET.SubElement(channel, "title").text = "Combined Le Monde RSS Feed"
-    ET.SubElement(channel, "link").text = "https://yourusername.github.io/combined.xml"
-    ET.SubElement(channel, "description").text = "Combined feed of multiple sources with archive.is/o/94ovq links"
-
+def write_rss(items, f):
+    # stream each piece to the file instead of holding the whole document
+    f.write(RSS_HEAD.encode("utf-8"))
     for item in items:
-        i = ET.SubElement(channel, "item")
-        ET.SubElement(i, "title").text = item["title"]
-        ET.SubElement(i, "link").text = item["link"]
-        ET.SubElement(i, "description").text = item["description"]
-        ET.SubElement(i, "pubDate").text = item["pubDate"]
-
-    return ET.tostring(rss, encoding="utf-8", xml_declaration=True)
+        f.write(ITEM_TMPL.format(
+            title=escape(item["title"]),
+            link=escape(f"{ARCHIVE_PREFIX}{item['original_link']}"),
+            description=escape(item["description"]),
+            pubDate=escape(item["pubDate"])
+        ).encode("utf-8"))
+    f.write(RSS_TAIL.encode("utf-8"))
 
 if __name__ == "__main__":
-    items = fetch_items(rss_feeds)
+    feed_cache = load_feed_cache()
+    items = fetch_items(rss_feeds, feed_cache)
+    save_feed_cache(feed_cache)
     print(f"Fetched {len(items)} unique articles.")
-    rss_xml = create_rss(items)
-    with open("combined.xml", "wb") as f:
-        f.write(rss_xml)
+    # buffered write to a temp file, then swap, so combined.xml is never partial
+    tmp_file = OUTPUT_FILE + ".tmp"
+    with open(tmp_file, "wb", buffering=1 << 20) as f:
+        write_rss(items, f)
+    os.replace(tmp_file, OUTPUT_FILE)
     print("Combined RSS feed created successfully.")